@@ -1,9 +1,10 @@
 import os
-from PyQt5.QtCore import QUrl, QSize, QThread, pyqtSignal, Qt, QTimer, QPoint
+from PyQt5.QtCore import QUrl, QSize, QThread, pyqtSignal, Qt, QTimer, QPoint, QObject
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QWidget, QLineEdit, QPushButton,
     QHBoxLayout, QTabWidget, QToolButton, QTabBar, QShortcut, QSplitter,
-    QTextEdit, QLabel, QProgressBar, QComboBox, QFrame
+    QTextEdit, QLabel, QProgressBar, QComboBox, QFrame, QDialog, QListWidget,
+    QListWidgetItem, QDialogButtonBox
 )
 from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEngineProfile, QWebEnginePage
 from PyQt5.QtGui import QColor, QPalette, QIcon, QKeySequence, QFont
@@ -12,6 +13,14 @@ import requests
 import json
 import sys
 import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from pygments import highlight
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import get_lexer_by_name, TextLexer
+from pygments.util import ClassNotFound
 
 def chat_with_ollama(prompt, model="deepseek-r1:8b"):
     url = "http://localhost:11434/api/generate"
@@ -33,8 +42,61 @@ class QHLine(QFrame):
         self.setFrameShape(QFrame.HLine)
         self.setFrameShadow(QFrame.Sunken)
 
+FENCED_CODE_RE = re.compile(r"^([ \t]*)```[ \t]*([\w+#.-]*)[^\n]*\n(.*?)^[ \t]*```[ \t]*$", re.MULTILINE | re.DOTALL)
+CODE_FORMATTER = HtmlFormatter(noclasses=True, style="monokai")
+
+class HighlightCache:
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, language, code):
+        key = (language, hashlib.sha1(code.encode("utf-8")).hexdigest())
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        highlighted = highlight_code(language, code)
+        with self.lock:
+            self.entries[key] = highlighted
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return highlighted
+
+def highlight_code(language, code):
+    try:
+        lexer = get_lexer_by_name(language) if language else TextLexer()
+    except ClassNotFound:
+        lexer = TextLexer()
+    return highlight(code, lexer, CODE_FORMATTER)
+
+highlight_cache = HighlightCache()
+
 def format_response(text):
+    # Only closed fences are highlighted; a block still streaming in is left
+    # to markdown2 until its closing ``` arrives.
+    blocks = []
+
+    def stash_block(match):
+        indent, language, code = match.groups()
+        # Fences nested in list items carry the item's indentation.
+        code = re.sub(rf"^[ \t]{{0,{len(indent)}}}", "", code, flags=re.MULTILINE)
+        blocks.append(highlight_cache.get(language.lower(), code))
+        return f"\n\n{indent}CHRONICOCODEBLOCK{len(blocks) - 1}\n\n"
+
+    text = FENCED_CODE_RE.sub(stash_block, text)
     formatted = markdown2.markdown(text, extras=["fenced-code-blocks", "tables"])
+    formatted = re.sub(
+        r"(?:<p>)?CHRONICOCODEBLOCK(\d+)(?:</p>)?",
+        lambda match: blocks[int(match.group(1))],
+        formatted,
+    )
     formatted = re.sub(r"<think>(.*?)</think>", r'<span style="color:#808080;">\1</span>', formatted, flags=re.DOTALL)
 
     return formatted
@@ -43,17 +105,19 @@ class AIWorker(QThread):
     chunk_received = pyqtSignal(str)
     finished = pyqtSignal()
 
-    def __init__(self, text, model, ai_panel):
+    def __init__(self, text, model, ai_panel, attachment=None):
         super().__init__()
         self.text = text
         self.model = model
+        self.attachment = attachment
         self._is_running = True
         self.ai_panel : AISidePanel = ai_panel
         self.final_response = ""
 
     def run(self):
         try:
-            for chunk in chat_with_ollama(self.text, self.model):
+            prompt = compose_prompt(self.text, self.attachment)
+            for chunk in chat_with_ollama(prompt, self.model):
                 if not self._is_running:
                     break
                 self.final_response += chunk
@@ -66,9 +130,407 @@ class AIWorker(QThread):
     def stop(self):
         self._is_running = False
 
+class PageAttachment:
+    def __init__(self, title, url, text):
+        self.title = title
+        self.url = url
+        self.text = text
+        self.size = len(text.encode("utf-8"))
+
+    @property
+    def token_estimate(self):
+        # Roughly four characters per token for English prose.
+        return len(self.text) // 4
+
+    def label(self):
+        title = self.title[:24] + "..." if len(self.title) > 24 else self.title
+        return f"{title or self.url} · {format_size(self.size)} · ~{self.token_estimate:,} tokens"
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024 or unit == "MB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def normalize_page_text(text):
+    lines = (re.sub(r"[ \t\u00a0]+", " ", line).strip() for line in text.splitlines())
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+DEFAULT_QUESTION = "Summarize this page content:"
+
+def compose_prompt(text, attachment=None):
+    if attachment is None:
+        return text
+    question = text.strip() or DEFAULT_QUESTION
+    return (
+        f"{question}\n\n"
+        f"Page: {attachment.title or 'Untitled'} ({attachment.url})\n"
+        f"<page>\n{attachment.text}\n</page>"
+    )
+
+class PageExtractWorker(QThread):
+    extracted = pyqtSignal(object)
+
+    def __init__(self, title, url, text, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.url = url
+        self.text = text
+
+    def run(self):
+        attachment = PageAttachment(self.title, self.url, normalize_page_text(self.text))
+        self.text = None
+        self.extracted.emit(attachment)
+
+class BatchSummarizer(QObject):
+    finished = pyqtSignal(str)
+
+    def __init__(self, tabs, model, max_concurrent=2, parent=None):
+        super().__init__(parent)
+        self.tabs = tabs
+        self.model = model
+        self.max_concurrent = max_concurrent
+        self.jobs = {}
+        self.queue = []
+        self.running = []
+        self.timings = {}
+        self.threads = []
+        self.pending_extracts = len(tabs)
+        self._is_running = True
+        self.started = None
+
+    def start(self):
+        self.started = time.monotonic()
+        for tab in self.tabs:
+            web_view = tab.web_view
+            self.timings[tab] = {"title": web_view.title(), "url": web_view.url().toString()}
+            tab.ai_panel.in_batch = True
+            tab.ai_panel.set_busy(True)
+            tab.ai_panel.stop_button.clicked.connect(self.stop)
+            tab.ai_panel.response_area.setHtml('<span style="color:#808080;">Queued for batch summary...</span>')
+            web_view.page().toPlainText(lambda text, tab=tab: self.handle_page_content(tab, text))
+
+    def handle_page_content(self, tab, text):
+        timing = self.timings[tab]
+        worker = PageExtractWorker(timing["title"], timing["url"], text, parent=self)
+        worker.extracted.connect(lambda attachment: self.handle_extracted(tab, attachment))
+        self.threads.append(worker)
+        worker.start()
+
+    def release(self, tab):
+        ai_panel = tab.ai_panel
+        ai_panel.in_batch = False
+        ai_panel.set_busy(False)
+        ai_panel.stop_button.clicked.disconnect(self.stop)
+
+    def handle_extracted(self, tab, attachment):
+        self.pending_extracts -= 1
+        self.timings[tab]["extract"] = time.monotonic() - self.started
+        if not self._is_running or not attachment.text:
+            self.release(tab)
+            tab.ai_panel.response_area.clear()
+        else:
+            key = hashlib.sha1(attachment.text.encode("utf-8")).hexdigest()
+            job = self.jobs.get(key)
+            if job:
+                job["tabs"].append(tab)
+                if "worker" in job:
+                    self.handle_chunk(job, format_response(job["worker"].final_response))
+                if "finished" in job:
+                    self.release(tab)
+                    if job.get("error"):
+                        self.show_error(tab)
+            else:
+                job = {"attachment": attachment, "tabs": [tab], "queued": time.monotonic()}
+                self.jobs[key] = job
+                self.queue.append(job)
+        self.pump()
+        self.check_done()
+
+    def pump(self):
+        while self._is_running and self.queue and len(self.running) < self.max_concurrent:
+            job = self.queue.pop(0)
+            job["started"] = time.monotonic()
+            worker = AIWorker(DEFAULT_QUESTION, self.model, job["tabs"][0].ai_panel, attachment=job["attachment"])
+            job["worker"] = worker
+            self.threads.append(worker)
+            worker.chunk_received.connect(lambda chunk, job=job: self.handle_chunk(job, chunk))
+            worker.finished.connect(lambda job=job: self.handle_job_finished(job))
+            self.running.append(job)
+            worker.start()
+
+    def handle_chunk(self, job, chunk):
+        for tab in job["tabs"]:
+            response_area = tab.ai_panel.response_area
+            response_area.setHtml(chunk)
+            response_area.verticalScrollBar().setValue(response_area.verticalScrollBar().maximum())
+
+    def handle_job_finished(self, job):
+        job["finished"] = time.monotonic()
+        # AIWorker swallows Ollama errors, so an empty answer means it failed.
+        job["error"] = not job.get("stopped") and not job["worker"].final_response
+        self.running.remove(job)
+        for tab in job["tabs"]:
+            self.release(tab)
+            if job["error"]:
+                self.show_error(tab)
+        self.pump()
+        self.check_done()
+
+    def show_error(self, tab):
+        tab.ai_panel.response_area.setHtml(
+            f'<span style="color:{COLORS["danger"]};">Summary failed: no response from Ollama.</span>'
+        )
+
+    def stop(self):
+        self._is_running = False
+        for job in self.queue:
+            for tab in job["tabs"]:
+                self.release(tab)
+                tab.ai_panel.response_area.clear()
+        self.queue = []
+        for job in self.running:
+            job["stopped"] = True
+            job["worker"].stop()
+        self.check_done()
+
+    def check_done(self):
+        if self.pending_extracts or self.queue or self.running:
+            return
+        # Results are signalled from inside run(), so let every thread
+        # return before the batch and its workers can be deleted.
+        for thread in self.threads:
+            thread.wait()
+        self.finished.emit(self.digest())
+
+    def digest(self):
+        total = time.monotonic() - self.started
+        ran = [job for job in self.jobs.values() if "finished" in job]
+        done = [job for job in ran if not job.get("stopped") and not job["error"]]
+        sections = [
+            "# Tab digest",
+            f"Summarized {sum(len(job['tabs']) for job in done)} of {len(self.tabs)} tabs "
+            f"({len(done)} unique pages) with {self.model} in {total:.1f}s.",
+        ]
+        for job in ran:
+            titles = ", ".join(self.timings[tab]["title"] or self.timings[tab]["url"] for tab in job["tabs"])
+            extract = max(self.timings[tab]["extract"] for tab in job["tabs"])
+            sections.append(f"## {titles}")
+            if job.get("stopped"):
+                sections.append("*Stopped before the summary finished.*")
+            elif job["error"]:
+                sections.append("*Summary failed: no response from Ollama.*")
+            else:
+                sections.append(re.sub(r"<think>.*?</think>", "", job["worker"].final_response, flags=re.DOTALL).strip())
+            sections.append(
+                f"*extract {extract:.1f}s · queued {job['started'] - job['queued']:.1f}s · "
+                f"generate {job['finished'] - job['started']:.1f}s*"
+            )
+        return "\n\n".join(sections)
+
+def resolve_url(text):
+    url = text.strip()
+    if not url.startswith(("http://", "https://", "file://")):
+        if "." in url:
+            url = "https://" + url
+        else:
+            url = f"https://www.google.com/search?q={url}"
+    return url
+
+def speculation_key(url):
+    return QUrl(url).adjusted(QUrl.StripTrailingSlash).toString()
+
+def is_search_url(url):
+    return url.startswith("https://www.google.com/search?")
+
+def url_origin(url):
+    return QUrl(url).adjusted(QUrl.RemovePath | QUrl.RemoveQuery | QUrl.RemoveFragment).toString()
+
+class Speculator(QObject):
+    def __init__(self, new_tab_url, max_pages=2, max_origins=8, max_known=500, ttl=30.0, grace=10.0, prerender=True, parent=None):
+        super().__init__(parent)
+        self.new_tab_url = new_tab_url
+        self.max_pages = max_pages
+        self.max_origins = max_origins
+        self.max_known = max_known
+        self.ttl = ttl
+        self.grace = grace
+        self.prerender_enabled = prerender
+        self.pages = {}
+        self.landing = {}
+        self.origins = []
+        self.known = {}
+        self.hint_page = QWebEnginePage(self)
+        self.stats = {
+            "preconnects": 0,
+            "prerenders": 0,
+            "hits": 0,
+            "misses": 0,
+            "wasted": 0,
+            "hit_loads": 0,
+            "hit_load_time": 0.0,
+            "miss_loads": 0,
+            "miss_load_time": 0.0,
+        }
+
+    def preconnect(self, url):
+        origin = url_origin(url)
+        if not origin.startswith(("http://", "https://")) or origin in self.origins:
+            return
+        self.origins.append(origin)
+        del self.origins[:-self.max_origins]
+        self.stats["preconnects"] += 1
+        links = "".join(
+            f'<link rel="dns-prefetch" href="{o}"><link rel="preconnect" href="{o}">'
+            for o in self.origins
+        )
+        self.hint_page.setHtml(f"<html><head>{links}</head></html>", QUrl("about:blank"))
+
+    def remember(self, url):
+        if is_search_url(url):
+            return
+        key = speculation_key(url)
+        self.known.pop(key, None)
+        self.known[key] = True
+        while len(self.known) > self.max_known:
+            self.known.pop(next(iter(self.known)))
+
+    def is_known(self, url):
+        return speculation_key(url) in self.known
+
+    def is_known_origin(self, url):
+        origin = url_origin(url)
+        return any(url_origin(key) == origin for key in self.known)
+
+    def prerender(self, url):
+        self.preconnect(url)
+        key = speculation_key(url)
+        if not self.prerender_enabled or key in self.pages:
+            return
+        self.expire()
+        while len(self.pages) >= self.max_pages:
+            oldest = min(self.pages, key=lambda k: self.pages[k]["started"])
+            self.discard(oldest)
+
+        # The hidden page only warms DNS, TLS and the HTTP cache; tabs keep
+        # their own page and history and load the URL normally.
+        page = QWebEnginePage(self)
+        page.setAudioMuted(True)
+        entry = {"page": page, "started": time.monotonic(), "finished": None}
+        page.loadFinished.connect(lambda ok, key=key, page=page: self.prerender_finished(key, page, ok))
+        self.pages[key] = entry
+        self.stats["prerenders"] += 1
+        page.setUrl(QUrl(url))
+
+    def prerender_finished(self, key, page, ok):
+        entry = self.pages.get(key)
+        if entry is None or entry["page"] is not page:
+            return
+        if not ok:
+            self.discard(key)
+        elif entry["finished"] is None:
+            entry["finished"] = time.monotonic()
+
+    def record_navigation(self, url, count_miss=True):
+        # True on a hit, False on a counted miss, None when not counted.
+        self.expire()
+        key = speculation_key(url)
+        entry = self.pages.pop(key, None)
+        if entry is None:
+            if count_miss:
+                self.stats["misses"] += 1
+                return False
+            return None
+        self.stats["hits"] += 1
+        # Keep the hidden page's requests alive while the tab loads the same URL.
+        self.landing[key] = entry["page"]
+        QTimer.singleShot(int(self.grace * 1000), lambda: self.release(key))
+        return True
+
+    def record_load(self, url, hit, elapsed):
+        if hit:
+            self.stats["hit_loads"] += 1
+            self.stats["hit_load_time"] += elapsed
+            self.release(speculation_key(url))
+        else:
+            self.stats["miss_loads"] += 1
+            self.stats["miss_load_time"] += elapsed
+
+    def release(self, key):
+        page = self.landing.pop(key, None)
+        if page:
+            page.deleteLater()
+
+    def expire(self):
+        now = time.monotonic()
+        for key in [k for k, e in self.pages.items() if now - e["started"] > self.ttl]:
+            self.discard(key)
+
+    def cancel(self, url):
+        self.discard(speculation_key(url))
+
+    def discard(self, key):
+        entry = self.pages.pop(key, None)
+        if entry:
+            self.stats["wasted"] += 1
+            entry["page"].deleteLater()
+
+    def summary(self):
+        s = self.stats
+        lookups = s["hits"] + s["misses"]
+        hit_rate = s["hits"] / lookups if lookups else 0.0
+        avg_hit_load = s["hit_load_time"] / s["hit_loads"] if s["hit_loads"] else 0.0
+        avg_miss_load = s["miss_load_time"] / s["miss_loads"] if s["miss_loads"] else 0.0
+        return (
+            f"Speculation: {s['hits']}/{lookups} hits ({hit_rate:.0%}), "
+            f"{s['prerenders']} prerenders, {s['wasted']} wasted, "
+            f"{s['preconnects']} preconnects, avg load {avg_hit_load:.2f}s on hits "
+            f"({s['hit_loads']}) vs {avg_miss_load:.2f}s on misses ({s['miss_loads']})"
+        )
+
+class BrowserPage(QWebEnginePage):
+    def __init__(self, speculator, parent=None):
+        super().__init__(parent)
+        self.speculator = speculator
+        self.pending_navigation = None
+        self.loadFinished.connect(self.handle_load_finished)
+
+    def is_new_tab(self):
+        return self.url() == self.speculator.new_tab_url
+
+    def track_navigation(self, url, count_miss=True):
+        hit = self.speculator.record_navigation(url, count_miss)
+        if hit is not None:
+            self.pending_navigation = (url, hit, time.monotonic())
+
+    def handle_load_finished(self, ok):
+        if ok and self.pending_navigation:
+            url, hit, started = self.pending_navigation
+            self.pending_navigation = None
+            self.speculator.record_load(url, hit, time.monotonic() - started)
+
+    def javaScriptConsoleMessage(self, level, message, line_number, source_id):
+        # Only the bundled new tab page may ask for speculative loads.
+        if not self.is_new_tab() or not message.startswith("chronico:"):
+            super().javaScriptConsoleMessage(level, message, line_number, source_id)
+            return
+        command, _, url = message.partition(" ")
+        if command == "chronico:preconnect":
+            self.speculator.preconnect(url)
+        elif command == "chronico:prerender":
+            self.speculator.prerender(url)
+        elif command == "chronico:cancel":
+            self.speculator.cancel(url)
+
+    def acceptNavigationRequest(self, url, nav_type, is_main_frame):
+        if is_main_frame and nav_type == QWebEnginePage.NavigationTypeLinkClicked:
+            self.track_navigation(url.toString(), count_miss=self.is_new_tab())
+        return super().acceptNavigationRequest(url, nav_type, is_main_frame)
+
 class WebTab(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, speculator, parent=None):
         super().__init__(parent)
+        self.speculator = speculator
         self.init_ui()
 
     def init_ui(self):
@@ -76,6 +538,7 @@ class WebTab(QWidget):
 
         self.splitter = QSplitter(Qt.Horizontal)
         self.web_view = QWebEngineView()
+        self.web_view.setPage(BrowserPage(self.speculator, self.web_view))
         self.splitter.addWidget(self.web_view)
         self.ai_panel = AISidePanel()
         self.splitter.addWidget(self.ai_panel)
@@ -225,6 +688,9 @@ class AISidePanel(QWidget):
             "deepseek-r1:8b",
             "llama3.2"
         ]
+        self.attachment = None
+        self.extract_worker = None
+        self.in_batch = False
         self.init_ui()
 
     def init_ui(self):
@@ -240,6 +706,20 @@ class AISidePanel(QWidget):
         self.input_area.setPlaceholderText("Type your question or press Ctrl+Shift+A to analyze current page...")
         self.input_area.setMaximumHeight(100)
 
+        self.attachment_chip = QFrame()
+        self.attachment_chip.setObjectName("chip")
+        chip_layout = QHBoxLayout(self.attachment_chip)
+        chip_layout.setContentsMargins(10, 4, 4, 4)
+        chip_layout.setSpacing(6)
+        self.attachment_label = QLabel()
+        self.attachment_label.setObjectName("chipLabel")
+        self.attachment_remove = QToolButton()
+        self.attachment_remove.setText("×")
+        self.attachment_remove.clicked.connect(self.clear_attachment)
+        chip_layout.addWidget(self.attachment_label, 1)
+        chip_layout.addWidget(self.attachment_remove)
+        self.attachment_chip.hide()
+
         self.progress = QProgressBar()
         self.progress.setMaximumHeight(2)
         self.progress.setTextVisible(False)
@@ -259,6 +739,7 @@ class AISidePanel(QWidget):
         controls_layout.addWidget(self.stop_button)
         layout.addWidget(self.model_selector)
         layout.addWidget(self.input_area)
+        layout.addWidget(self.attachment_chip)
         layout.addWidget(self.progress)
         layout.addLayout(controls_layout)
         layout.addWidget(self.response_area)
@@ -318,6 +799,18 @@ class AISidePanel(QWidget):
             QComboBox::drop-down:button {{
                 border-radius: 8px;
             }}
+            QFrame#chip {{
+                background-color: {COLORS['bg_tertiary']};
+                border-radius: 8px;
+            }}
+            QFrame#chip QLabel, QFrame#chip QToolButton {{
+                background: transparent;
+                border: none;
+                font-weight: 400;
+                font-size: 12px;
+                margin: 0;
+                color: {COLORS['text_secondary']};
+            }}
         """)
         self.send_button.setObjectName("send")
         self.stop_button.setObjectName("stop")
@@ -326,18 +819,72 @@ class AISidePanel(QWidget):
     def model(self):
         return self.model_selector.currentText()
 
+    def set_busy(self, busy):
+        self.progress.setVisible(busy)
+        self.stop_button.setVisible(busy)
+        self.send_button.setVisible(not busy)
+
+    def show_extracting(self, title):
+        self.attachment = None
+        self.attachment_label.setText(f"Extracting {title or 'page'}...")
+        self.attachment_chip.show()
+        self.send_button.setEnabled(False)
+
+    def set_attachment(self, attachment):
+        self.attachment = attachment
+        self.send_button.setEnabled(True)
+        self.attachment_label.setText(attachment.label())
+        self.attachment_label.setToolTip(attachment.url)
+        self.attachment_chip.show()
+
+    def clear_attachment(self):
+        self.attachment = None
+        self.extract_worker = None
+        self.attachment_chip.hide()
+        self.send_button.setEnabled(True)
+
     def format_ai_response(response: str) -> str:
         response = response.replace("<think>", '<span style="color:gray;"><i>') \
                         .replace("</think>", "</i></span>") \
                         .replace("</finish>", '<hr style="border: none; border-top: 1px solid gray;">')
         return response
 
+class TabPickerDialog(QDialog):
+    def __init__(self, tabs, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Summarize tabs")
+        layout = QVBoxLayout(self)
+
+        self.tab_list = QListWidget()
+        for tab in tabs:
+            item = QListWidgetItem(tab.web_view.title() or tab.web_view.url().toString())
+            item.setData(Qt.UserRole, tab)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked)
+            self.tab_list.addItem(item)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(self.tab_list)
+        layout.addWidget(buttons)
+
+    def selected_tabs(self):
+        items = (self.tab_list.item(i) for i in range(self.tab_list.count()))
+        return [item.data(Qt.UserRole) for item in items if item.checkState() == Qt.Checked]
+
 class Browser(QMainWindow):
     def __init__(self):
         super().__init__()
         self.new_tab_path = QUrl().fromLocalFile(os.path.abspath("templates/new_tab.html"))
+        self.speculator = Speculator(self.new_tab_path, parent=self)
+        self.speculation_timer = QTimer(self)
+        self.speculation_timer.setSingleShot(True)
+        self.speculation_timer.setInterval(300)
+        self.speculation_timer.timeout.connect(self.speculate_from_search_bar)
         self.init_ui()
         self.current_worker = None
+        self.batch = None
         self.setWindowFlags(Qt.FramelessWindowHint)
         self.setAttribute(Qt.WA_TranslucentBackground)
 
@@ -457,58 +1004,81 @@ class Browser(QMainWindow):
 
         self.add_new_tab()
         self.search_bar.returnPressed.connect(self.navigate_to_url)
+        self.search_bar.textEdited.connect(lambda: self.speculation_timer.start())
         self.tabs.currentChanged.connect(self.tab_changed)
 
         QShortcut(QKeySequence("Ctrl+T"), self, self.add_new_tab)
         QShortcut(QKeySequence("Ctrl+W"), self, lambda: self.close_tab(self.tabs.currentIndex()))
         QShortcut(QKeySequence("Ctrl+Shift+A"), self, self.analyze_current_page)
         QShortcut(QKeySequence("Ctrl+Shift+S"), self, self.move_page_to_ai_search)
+        QShortcut(QKeySequence("Ctrl+Shift+B"), self, self.summarize_tabs)
 
     def move_page_to_ai_search(self):
         current_tab = self.tabs.currentWidget()
-        if not current_tab:
+        if not current_tab or current_tab.ai_panel.in_batch:
             return
 
-        web_view = current_tab.web_view
-        ai_panel = current_tab.ai_panel
+        self.attach_page(current_tab)
+
+    def attach_page(self, tab, on_ready=None):
+        web_view = tab.web_view
+        ai_panel = tab.ai_panel
+        title = web_view.title()
+        url = web_view.url().toString()
+        ai_panel.show_extracting(title)
 
         def handle_page_content(content):
-            ai_panel.input_area.setText(content)
+            worker = PageExtractWorker(title, url, content, parent=ai_panel)
+            ai_panel.extract_worker = worker
+            worker.extracted.connect(lambda attachment: handle_extracted(worker, attachment))
+            worker.finished.connect(worker.deleteLater)
+            worker.start()
+
+        def handle_extracted(worker, attachment):
+            if ai_panel.extract_worker is not worker:
+                return
+            ai_panel.extract_worker = None
+            ai_panel.set_attachment(attachment)
+            if on_ready:
+                on_ready(ai_panel)
 
         web_view.page().toPlainText(handle_page_content)
 
     def add_new_tab(self):
-        new_tab = WebTab()
+        new_tab = WebTab(self.speculator)
         index = self.tabs.addTab(new_tab, "New Tab")
         self.tabs.setCurrentIndex(index)
 
         web_view = new_tab.web_view
-        web_view.loadFinished.connect(lambda: self.update_tab_info(web_view))
+        web_view.loadFinished.connect(lambda ok: self.update_tab_info(web_view, ok))
         web_view.setUrl(self.new_tab_path)
 
         ai_panel = new_tab.ai_panel
         ai_panel.send_button.clicked.connect(lambda: self.process_ai_request(ai_panel))
-        ai_panel.stop_button.clicked.connect(self.stop_ai_request)
+        ai_panel.stop_button.clicked.connect(lambda: self.stop_ai_request(ai_panel))
 
         return new_tab
 
-    def stop_ai_request(self):
-        if self.current_worker:
+    def stop_ai_request(self, ai_panel):
+        if ai_panel.in_batch:
+            return
+        if self.current_worker and self.current_worker.ai_panel is ai_panel:
             self.current_worker.stop()
-            current_tab = self.tabs.currentWidget()
-            ai_panel = current_tab.ai_panel
             ai_panel.stop_button.hide()
             ai_panel.send_button.show()
             ai_panel.progress.hide()
 
     def process_ai_request(self, ai_panel : AISidePanel):
+        if ai_panel.in_batch or ai_panel.extract_worker:
+            return
         ai_panel.progress.show()
         ai_panel.send_button.hide()
         ai_panel.stop_button.show()
         ai_panel.response_area.clear()
 
-        self.current_worker = AIWorker(ai_panel.input_area.toPlainText(), model = ai_panel.model, ai_panel=ai_panel)
+        self.current_worker = AIWorker(ai_panel.input_area.toPlainText(), model = ai_panel.model, ai_panel=ai_panel, attachment=ai_panel.attachment)
         ai_panel.input_area.setText("")
+        ai_panel.clear_attachment()
 
         self.current_worker.chunk_received.connect(lambda chunk: self.handle_ai_chunk(chunk, ai_panel))
         self.current_worker.finished.connect(lambda: self.handle_ai_finished(ai_panel))
@@ -534,17 +1104,34 @@ class Browser(QMainWindow):
             self.add_new_tab()
 
     def navigate_to_url(self):
-        url = self.search_bar.text().strip()
-        if not url.startswith(("http://", "https://", "file://")):
-            if "." in url:
-                url = "https://" + url
-            else:
-                url = f"https://www.google.com/search?q={url}"
+        self.speculation_timer.stop()
+        url = resolve_url(self.search_bar.text())
 
         current_tab = self.tabs.currentWidget()
+        if not is_search_url(url):
+            current_tab.web_view.page().track_navigation(url)
         current_tab.web_view.setUrl(QUrl(url))
 
-    def update_tab_info(self, web_view):
+    def speculate_from_search_bar(self):
+        text = self.search_bar.text().strip()
+        if not text:
+            return
+        url = resolve_url(text)
+        # Half-typed hostnames are left alone; only searches and origins the
+        # user has visited are warmed, and only visited URLs are prerendered.
+        if is_search_url(url):
+            self.speculator.preconnect(url)
+        elif self.speculator.is_known(url):
+            self.speculator.prerender(url)
+        elif self.speculator.is_known_origin(url):
+            self.speculator.preconnect(url)
+
+    def closeEvent(self, event):
+        sys.stdout.write(self.speculator.summary() + "\n")
+        sys.stdout.flush()
+        super().closeEvent(event)
+
+    def update_tab_info(self, web_view, ok=True):
         index = self.tab_index_from_web_view(web_view)
         if index >= 0:
             title = web_view.title()
@@ -552,6 +1139,8 @@ class Browser(QMainWindow):
                 self.tabs.setTabText(index, title[:20] + "..." if len(title) > 20 else title)
                 self.title_bar.title.setText(title + " - Chronico" if len(title)<=20 else title[:20]+"..." + " - Chronico")
             self.search_bar.setText(web_view.url().toString())
+            if ok and not web_view.url().isLocalFile():
+                self.speculator.remember(web_view.url().toString())
 
     def tab_index_from_web_view(self, web_view):
         for i in range(self.tabs.count()):
@@ -568,11 +1157,40 @@ class Browser(QMainWindow):
 
     def analyze_current_page(self):
         current_tab = self.tabs.currentWidget()
-        current_tab.web_view.page().toPlainText(lambda text: self.handle_page_content(text, current_tab.ai_panel))
+        if current_tab.ai_panel.in_batch:
+            return
+        self.attach_page(current_tab, on_ready=self.process_ai_request)
+
+    def summarize_tabs(self):
+        if self.batch:
+            return
+        busy_panel = self.current_worker.ai_panel if self.current_worker else None
+        tabs = [self.tabs.widget(i) for i in range(self.tabs.count())]
+        tabs = [
+            tab for tab in tabs
+            if not tab.web_view.url().isLocalFile() and tab.ai_panel is not busy_panel
+        ]
+        if not tabs:
+            return
+
+        dialog = TabPickerDialog(tabs, self)
+        if dialog.exec_() == QDialog.Accepted:
+            self.summarize_all_tabs(dialog.selected_tabs())
+
+    def summarize_all_tabs(self, tabs):
+        if self.batch or not tabs:
+            return
+
+        model = self.tabs.currentWidget().ai_panel.model
+        self.batch = BatchSummarizer(tabs, model, parent=self)
+        self.batch.finished.connect(self.handle_batch_finished)
+        self.batch.start()
 
-    def handle_page_content(self, text, ai_panel):
-        ai_panel.input_area.setText(f"Summarize this page content:\n\n{text}...")
-        self.process_ai_request(ai_panel)
+    def handle_batch_finished(self, digest):
+        self.batch.deleteLater()
+        self.batch = None
+        digest_tab = self.add_new_tab()
+        digest_tab.ai_panel.response_area.setHtml(format_response(digest))
 
 def main():
     app = QApplication(sys.argv)